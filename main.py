@@ -18,6 +18,8 @@ Features:
 
 Usage:
     Simply run the script and follow the CLI prompts to input necessary parameters.
+    Parameters can also be passed as command-line options or a JSON file via --config
+    (see --help); only the missing ones are prompted for.
     Results will be logged in a specified output file.
 
 Disclaimer:
@@ -32,109 +34,322 @@ Author:
 Date:
     Created on: September 2, 2023
 """
-import datetime
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import os
 
 import routeros_api
 import json
-import time
+import socket
+import sys
+import threading
+
+
+# Bandwidth test fields reported in bps, converted to Mbps for the log
+BPS_FIELDS = [
+    "tx-current",
+    "tx-10-second-avg",
+    "tx-total-avg",
+    "rx-current",
+    "rx-10-second-average",
+]
+RESULT_HEADERS = [
+    "status",
+    "duration",
+    "tx-current",
+    "tx-10-second-avg",
+    "tx-total-avg",
+    "rx-current",
+    "rx-10-second-average",
+    "rx-total-avg",
+    "random-data",
+    "direction",
+    "conn-count",
+    ".section",
+    "local-cpu-load",
+    "remote-cpu-load",
+]
+
+# Fixed parts of the results log, formatted once at import time
+RESULT_ROW_FORMAT = "| {:<13}| {:<9}| {:<11}| {:<17}| {:<13}| {:<11}| {:<17}| {:<13}| {:<12}| {:<9}| {:<10}| {:<8}| {:<15}| {:<15}|"
+RESULT_TABLE_BORDER = "+{:-^14}+{:-^10}+{:-^12}+{:-^18}+{:-^14}+{:-^12}+{:-^18}+{:-^14}+{:-^13}+{:-^10}+{:-^11}+{:-^9}+{:-^16}+{:-^16}+".format(
+    *[""] * len(RESULT_HEADERS)
+)
+RESULT_TABLE_HEADER = "\n".join(
+    [RESULT_ROW_FORMAT.format(*RESULT_HEADERS), RESULT_TABLE_BORDER, ""]
+)
+PARAMETER_TABLE_HEADER = "".join(
+    [
+        "+{:-^24}+{:-^26}+\n".format("", ""),
+        "| {:<23}| {:<25}|\n".format("Parameter", "Value"),
+        "+{:-^24}+{:-^26}+\n".format("", ""),
+    ]
+)
+
+_iface_cache: dict[int, list] = {}
+# Registration table readings keyed by id(resource): (loop time of the read, rows)
+_registration_cache: dict[int, tuple[float, list]] = {}
+REGISTRATION_CACHE_TTL = 2.0
+# All resources share one API socket, so only one call may use it at a time
+_api_lock = threading.Lock()
 
 
-SHARED_DATA = {}
+def parse_tx_limit(value):
+    """
+    Parse a Tx limit given on the command line.
 
+    Args:
+    - value (str): Limit in Mbps, or "unlimited".
 
-def gather_info():
+    Returns:
+    - int | str: The limit in Mbps, or "unlimited".
     """
-    Interactively gather information from the user about the AP and bandwidth test parameters.
+    if value.lower() == "unlimited":
+        return "unlimited"
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid limit {value!r}: expected Mbps or 'unlimited'"
+        )
+
+
+def parse_freq_range(value):
+    """
+    Parse a frequency range given on the command line.
+
+    Args:
+    - value (str): Range in ``low-high`` form, in MHz (e.g. "4900-6100").
+
+    Returns:
+    - list: ``[low, high]`` as integers.
+    """
+    try:
+        low, high = (int(freq) for freq in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid frequency range {value!r}: expected low-high, e.g. 4900-6100"
+        )
+    if low > high:
+        raise argparse.ArgumentTypeError(
+            f"invalid frequency range {value!r}: low end is above high end"
+        )
+    return [low, high]
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line options for a non-interactive run.
+
+    Values missing from the command line are taken from the ``--config`` JSON file, if given.
+    File values go through the same type and choice checks as command-line ones.
+    Anything still missing is prompted for by ``gather_info``.
+
+    Args:
+    - argv (list, optional): Arguments to parse. Defaults to ``sys.argv[1:]``.
+
+    Returns:
+    - argparse.Namespace: Parsed options; unset values are None.
+    """
+    parser = argparse.ArgumentParser(
+        description="Automated frequency and bandwidth tester for MikroTik devices."
+    )
+    parser.add_argument("--ap-ip", help="AP IP address")
+    parser.add_argument("--ap-user", help="AP username")
+    parser.add_argument("--ap-pass", help="AP password")
+    parser.add_argument("--ap-port", type=int, help="AP API port (default 8728)")
+    parser.add_argument(
+        "--freq-range", type=parse_freq_range, help="frequency range, e.g. 4900-6100"
+    )
+    parser.add_argument("--station-ip", help="station IP address")
+    parser.add_argument("--protocol", choices=["tcp", "udp"])
+    parser.add_argument("--direction", choices=["send", "receive", "both"])
+    parser.add_argument(
+        "--local-tx", type=parse_tx_limit, help="local Tx limit in Mbps or 'unlimited'"
+    )
+    parser.add_argument(
+        "--remote-tx",
+        type=parse_tx_limit,
+        help="remote Tx limit in Mbps or 'unlimited'",
+    )
+    parser.add_argument("--duration", type=int, help="test duration in seconds")
+    parser.add_argument(
+        "--config",
+        help="JSON file with any of the above options, keyed by their long names "
+        "with underscores (e.g. ap_ip); values take their command-line form, except "
+        "that freq_range may also be a [low, high] list",
+    )
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, "r") as f:
+            file_options = json.load(f)
+        file_argv = []
+        for key, value in file_options.items():
+            if key == "config" or not hasattr(args, key):
+                parser.error(f"unknown option {key!r} in {args.config}")
+            if value is None:
+                continue
+            if key == "freq_range" and isinstance(value, list):
+                value = "-".join(str(freq) for freq in value)
+            # Bind each value with "=" so values starting with "-" are not read as options
+            file_argv.append(f"--{key.replace('_', '-')}={value}")
+        # Parse file values first so anything given on the command line overrides them
+        args = parser.parse_args(file_argv + argv)
+
+    return args
+
+
+def gather_info(options=None):
+    """
+    Gather information about the AP and bandwidth test parameters.
+
+    Values already present in ``options`` are used as given; the user is prompted only for the rest.
+    When every required value is supplied, the optional ones (port, frequency range, Tx limits)
+    fall back to their defaults instead of being prompted for.
+
+    Args:
+    - options (argparse.Namespace, optional): Options from ``parse_args``. Defaults to prompting for everything.
 
     Returns:
     - tuple: A tuple containing dictionaries for AP details, frequency range, and bandwidth test parameters.
     """
+    options = options or parse_args([])
+    required = [
+        options.ap_ip,
+        options.ap_user,
+        options.ap_pass,
+        options.station_ip,
+        options.protocol,
+        options.direction,
+        options.duration,
+    ]
+    interactive = any(value is None for value in required)
 
-    # Welcome message
-    message = """
+    if interactive:
+        # Welcome message
+        message = """
       ___       __   __         ___    ___  __                   __   __  ___            ___ 
 |  | |__  |    /  ` /  \  |\/| |__      |  /  \     |\/| | |__/ |__) /  \  |  |  | |\ | |__  
 |/\| |___ |___ \__, \__/  |  | |___     |  \__/     |  | | |  \ |  \ \__/  |  \__/ | \| |___ 
                                                                                                                                                                                                                                                                                                                                                                                                                                                     
-    """
-    print(message)
-    input("Press Enter to begin...")
+        """
+        print(message)
+        input("Press Enter to begin...")
 
     # AP Details
-    ap_details = {"IP": input("\nEnter AP IP Address: ")}
+    ap_details = {"IP": options.ap_ip or input("\nEnter AP IP Address: ")}
+    ap_details["username"] = options.ap_user or input("Enter AP username: ")
+    ap_details["password"] = (
+        options.ap_pass if options.ap_pass is not None else input("Enter AP password: ")
+    )
 
-    while True:
-        ap_details["username"] = input("Enter AP username: ")
-        ap_details["password"] = input("Enter AP password: ")
-        try:
-            ap_details["port"] = int(input("Enter AP port (default 8728): ") or 8728)
-            break
-        except ValueError:
-            print("Please enter a valid port number.")
+    if options.ap_port is not None or not interactive:
+        ap_details["port"] = options.ap_port or 8728
+    else:
+        while True:
+            try:
+                ap_details["port"] = int(
+                    input("Enter AP port (default 8728): ") or 8728
+                )
+                break
+            except ValueError:
+                print("Please enter a valid port number.")
 
     # Frequency Range
-    frequency_range = input("\nEnter frequency range (default 4900-6100): ").split("-")
-    if not frequency_range or len(frequency_range) != 2:
+    if options.freq_range is not None:
+        frequency_range = options.freq_range
+    elif not interactive:
         frequency_range = [4900, 6100]
     else:
-        frequency_range = [int(freq) for freq in frequency_range]
+        freq_input = input("\nEnter frequency range (default 4900-6100): ")
+        frequency_range = freq_input.split("-")
+        if not frequency_range or len(frequency_range) != 2:
+            frequency_range = [4900, 6100]
+        else:
+            frequency_range = [int(freq) for freq in frequency_range]
 
     # Bandwidth Test Parameters
     bandwidth_test_params: dict[str, str | None | int] = {
-        "station_IP": input("\nEnter Station IP Address: ")
+        "station_IP": options.station_ip or input("\nEnter Station IP Address: ")
     }
 
     # Choose protocol with number
     protocol_options = ["tcp", "udp"]
-    for idx, protocol in enumerate(protocol_options, start=1):
-        print(f"{idx}. {protocol.upper()}")
-    while True:
-        choice = input("Choose Protocol (1 for TCP / 2 for UDP): ")
-        if choice in ["1", "2"]:
-            bandwidth_test_params["protocol"] = protocol_options[int(choice) - 1]
-            break
-        else:
-            print("Invalid choice. Please choose 1 or 2.")
+    if options.protocol:
+        bandwidth_test_params["protocol"] = options.protocol
+    else:
+        for idx, protocol in enumerate(protocol_options, start=1):
+            print(f"{idx}. {protocol.upper()}")
+        while True:
+            choice = input("Choose Protocol (1 for TCP / 2 for UDP): ")
+            if choice in ["1", "2"]:
+                bandwidth_test_params["protocol"] = protocol_options[int(choice) - 1]
+                break
+            else:
+                print("Invalid choice. Please choose 1 or 2.")
 
     # Choose direction with number
     direction_options = ["send", "receive", "both"]
-    for idx, direction in enumerate(direction_options, start=1):
-        print(f"{idx}. {direction}")
-    while True:
-        choice = input("Choose Direction (1 for send / 2 for receive / 3 for both): ")
-        if choice in ["1", "2", "3"]:
-            bandwidth_test_params["direction"] = direction_options[int(choice) - 1]
-            break
-        else:
-            print("Invalid choice. Please choose 1, 2, or 3.")
+    if options.direction:
+        bandwidth_test_params["direction"] = options.direction
+    else:
+        for idx, direction in enumerate(direction_options, start=1):
+            print(f"{idx}. {direction}")
+        while True:
+            choice = input(
+                "Choose Direction (1 for send / 2 for receive / 3 for both): "
+            )
+            if choice in ["1", "2", "3"]:
+                bandwidth_test_params["direction"] = direction_options[int(choice) - 1]
+                break
+            else:
+                print("Invalid choice. Please choose 1, 2, or 3.")
 
     # Specify Limit or Unlimited
-    specify_limit = input("\nDo you want to specify a limit? (yes/no) [no]: ").lower()
-    if specify_limit == "yes":
-        loca_tx = input("Enter local Tx limit in Mbps (default unlimited): ")
-        remote_tx = input("Enter remote TX limit in Mbps (default unlimited): ")
-
-        bandwidth_test_params["local_tx"] = int(loca_tx) if loca_tx else "unlimited"
+    if options.local_tx is not None or options.remote_tx is not None or not interactive:
+        bandwidth_test_params["local_tx"] = (
+            "unlimited" if options.local_tx is None else options.local_tx
+        )
         bandwidth_test_params["remote_tx"] = (
-            int(remote_tx) if remote_tx else "unlimited"
+            "unlimited" if options.remote_tx is None else options.remote_tx
         )
     else:
-        bandwidth_test_params["local_tx"] = "unlimited"
-        bandwidth_test_params["remote_tx"] = "unlimited"
+        specify_limit = input(
+            "\nDo you want to specify a limit? (yes/no) [no]: "
+        ).lower()
+        if specify_limit == "yes":
+            loca_tx = input("Enter local Tx limit in Mbps (default unlimited): ")
+            remote_tx = input("Enter remote TX limit in Mbps (default unlimited): ")
+
+            bandwidth_test_params["local_tx"] = int(loca_tx) if loca_tx else "unlimited"
+            bandwidth_test_params["remote_tx"] = (
+                int(remote_tx) if remote_tx else "unlimited"
+            )
+        else:
+            bandwidth_test_params["local_tx"] = "unlimited"
+            bandwidth_test_params["remote_tx"] = "unlimited"
 
     # Duration
-    while True:
-        try:
-            bandwidth_test_params["duration"] = (
-                int(input("\nEnter test duration in seconds: ")) + 1
-            )
-            break
-        except ValueError:
-            print("Please enter a valid duration in seconds.")
+    if options.duration is not None:
+        bandwidth_test_params["duration"] = int(options.duration) + 1
+    else:
+        while True:
+            try:
+                bandwidth_test_params["duration"] = (
+                    int(input("\nEnter test duration in seconds: ")) + 1
+                )
+                break
+            except ValueError:
+                print("Please enter a valid duration in seconds.")
 
     return ap_details, frequency_range, bandwidth_test_params
 
 
+@functools.lru_cache(maxsize=4)
 def read_config_from_json(json_file_path):
     """
     Read configuration details from a given JSON file.
@@ -151,24 +366,118 @@ def read_config_from_json(json_file_path):
     return config_data["config"]
 
 
-def set_frequency(api, frequency):
-    resource = api.get_resource("/interface/wireless")
-    wireless_interfaces = resource.get()
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking RouterOS API call in the default executor so the event loop stays free.
+
+    Calls are serialized on the shared API socket, so concurrently awaited calls never interleave.
+
+    Args:
+    - func (callable): The blocking function to call.
+    - *args, **kwargs: Arguments forwarded to ``func``.
+
+    Returns:
+    - Any: Whatever ``func`` returns.
+    """
+
+    def locked_call():
+        with _api_lock:
+            return func(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, locked_call)
+
+
+def tune_api_socket(connection):
+    """
+    Disable Nagle's algorithm on the API socket so small request/reply sentences are sent immediately.
+
+    routeros_api already enables TCP keepalive on the socket it opens, so that is left untouched.
 
-    for interface in wireless_interfaces:
+    Args:
+    - connection (routeros_api.RouterOsApiPool): A connected API pool.
+    """
+    sock = getattr(connection.socket, "socket", None)
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+async def get_wireless_interfaces(resource):
+    """
+    Return the AP's wireless interfaces, querying the device only on the first call per resource.
+
+    Args:
+    - resource (object): The ``/interface/wireless`` API resource.
+
+    Returns:
+    - list: Wireless interfaces as returned by ``resource.get()``.
+    """
+    key = id(resource)
+    if key not in _iface_cache:
+        _iface_cache[key] = await run_blocking(resource.get)
+    return _iface_cache[key]
+
+
+async def get_registration_table(resource, max_age=REGISTRATION_CACHE_TTL):
+    """
+    Read the wireless registration table, reusing a reading that is at most ``max_age`` seconds old.
+
+    Args:
+    - resource (object): The ``interface/wireless/registration-table`` API resource.
+    - max_age (float, optional): Maximum age (in seconds) of a cached reading. Pass 0 to always query the device.
+
+    Returns:
+    - list: Registration table entries.
+    """
+    loop = asyncio.get_running_loop()
+    key = id(resource)
+    cached = _registration_cache.get(key)
+    if cached is not None and loop.time() - cached[0] < max_age:
+        return cached[1]
+
+    registration_status = await run_blocking(resource.get)
+    _registration_cache[key] = (loop.time(), registration_status)
+    return registration_status
+
+
+async def set_frequency(resource, interface_ids, frequency, frequency_bytes):
+    """
+    Set the given frequency on every wireless interface of the AP.
+
+    Args:
+    - resource (object): The binary ``/interface/wireless`` API resource, which sends values as given.
+    - interface_ids (list): ``(name, id_bytes)`` pairs for the wireless interfaces, ids already encoded.
+    - frequency (int): Frequency in MHz to apply, used for status messages.
+    - frequency_bytes (bytes): The same frequency, already encoded for the wire.
+    """
+    # Registrations seen on the previous frequency are no longer valid
+    _registration_cache.clear()
+
+    def send_all():
+        # Write every set command before reading any reply, so all interfaces share one round-trip
+        return [
+            resource.call_async(
+                "set", {"id": interface_id, "frequency": frequency_bytes}
+            )
+            for _, interface_id in interface_ids
+        ]
+
+    promises = await run_blocking(send_all)
+
+    for (name, _), promise in zip(interface_ids, promises):
         try:
-            resource.set(id=interface["id"], frequency=str(frequency))
-            print(f"Frequency set to {frequency} for interface {interface['name']}")
+            await run_blocking(promise.get)
+            print(f"Frequency set to {frequency} for interface {name}")
         except Exception as e:
-            print(f"Error setting frequency for interface {interface['name']}: {e}")
+            print(f"Error setting frequency for interface {name}: {e}")
 
 
-def update_ping_time(api, ap_address, station_address, count=4):
+async def update_ping_time(root_resource, ap_address, station_address, count=4):
     """
     Pings the station from the access point (AP) to get the average round-trip time (RTT).
 
     Args:
-    - api (object): An instance or object representing the API to interact with.
+    - root_resource (object): The ``/`` API resource used to issue the ping command.
     - ap_address (str): IP Address of the Access Point.
     - station_address (str): IP Address of the Station to be pinged.
     - count (int, optional): Number of ping attempts. Defaults to 4.
@@ -181,9 +490,14 @@ def update_ping_time(api, ap_address, station_address, count=4):
     """
     try:
         # Send ping requests via the API
-        ping_responses = api.get_resource("/").call(
+        ping_responses = await run_blocking(
+            root_resource.call,
             "ping",
-            {"address": station_address, "count": "4", "src-address": ap_address},
+            {
+                "address": station_address,
+                "count": str(count),
+                "src-address": ap_address,
+            },
         )
 
         # Check if 'avg-rtt' exists in the last response
@@ -201,29 +515,66 @@ def update_ping_time(api, ap_address, station_address, count=4):
         return float("inf")  # return a large number to signify an error
 
 
-def check_station_registered(
-    api, wait_time, config_ping_value, ap_address, station_address
+async def wait_for_station_ready(root_resource, timeout, ap_address, station_address):
+    """
+    Waits until a freshly registered station answers a ping, or until the timeout expires.
+
+    Args:
+    - root_resource (object): The ``/`` API resource used to issue the ping command.
+    - timeout (float): Maximum time (in seconds) to wait for the station to become pingable.
+    - ap_address (str): IP Address of the Access Point.
+    - station_address (str): IP Address of the Station to be probed.
+
+    Returns:
+    - bool: True if the station answered before the timeout, False otherwise.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    while loop.time() < deadline:
+        rtt = await update_ping_time(
+            root_resource, ap_address, station_address, count=1
+        )
+        if rtt != float("inf"):
+            return True
+        await asyncio.sleep(0.5)
+
+    return False
+
+
+async def check_station_registered(
+    registration_resource,
+    root_resource,
+    wait_time,
+    config_ping_value,
+    ap_address,
+    station_address,
 ):
     """
     Checks if a station is registered within a given wait time and meets specific ping and signal strength conditions.
 
     Args:
-    - api (object): An instance or object representing the API to interact with.
+    - registration_resource (object): The ``interface/wireless/registration-table`` API resource.
+    - root_resource (object): The ``/`` API resource used to issue the ping command.
     - wait_time (int): Time (in seconds) to wait and check for the station's registration.
     - config_ping_value (float): Threshold value for the average ping time.
     - ap_address (str): IP Address of the Access Point.
     - station_address (str): IP Address of the Station to be checked.
 
     Returns:
-    - bool: True if station meets conditions, False otherwise.
+    - tuple: ``(passed, avg_ping_time, signal_strength)`` where ``passed`` is True if the station
+      meets the conditions. If the station never registers, the ping is ``float("inf")`` and the signal is None.
     """
-    registration_resource = api.get_resource("interface/wireless/registration-table")
-    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
     is_station_registered = False
     config = read_config_from_json("config.json")
+    poll_interval = 0.5
 
-    while time.time() - start_time < wait_time:
-        registration_status = registration_resource.get()
+    while loop.time() - start_time < wait_time:
+        registration_status = await get_registration_table(
+            registration_resource, max_age=0
+        )
 
         # Check if the station has registered based on list length
         if len(registration_status) > 0:
@@ -231,36 +582,63 @@ def check_station_registered(
 
         # If the station is registered, start pinging
         if is_station_registered:
+            # Skip the readiness wait and pings entirely when the signal is already too weak
+            signal_strength = int(registration_status[0].get("signal-strength", "-999"))
+            valid_signal = config["valid_tx_signal"]
+            if signal_strength <= valid_signal:
+                print(f"Signal strength {signal_strength} is too weak, skipping.")
+                return False, float("inf"), signal_strength
+
             print("Station registered, waiting for readiness!")
-            time.sleep(20)
+            if not await wait_for_station_ready(
+                root_resource,
+                config.get("wait_for_readiness", 25),
+                ap_address,
+                station_address,
+            ):
+                print("Station did not answer pings in time, skipping.")
+                return False, float("inf"), signal_strength
+
             print("Start pinging")
-            avg_ping_time = update_ping_time(api, ap_address, station_address)
-            SHARED_DATA["average_ping_time"] = avg_ping_time
+            # Refresh the registration entry while running a short triage ping
+            registration_status, avg_ping_time = await asyncio.gather(
+                get_registration_table(registration_resource),
+                update_ping_time(root_resource, ap_address, station_address, count=2),
+            )
+            signal_strength = (
+                int(registration_status[0].get("signal-strength", "-999"))
+                if registration_status
+                else -999
+            )
+
+            # Spend the full 4-packet measurement only on frequencies that look viable
+            if signal_strength > valid_signal and avg_ping_time < config_ping_value:
+                avg_ping_time = await update_ping_time(
+                    root_resource, ap_address, station_address
+                )
+
             print(f"Average ping time: {avg_ping_time}")
 
-            signal_strength = int(registration_status[0].get("signal-strength", "-999"))
-            SHARED_DATA["signal"] = signal_strength
-            valid_signal = config["valid_tx_signal"]
             # Check both conditions: signal strength and ping average
-            if signal_strength > valid_signal and avg_ping_time < config_ping_value:
-                return True
-            else:
-                # Exit the loop if station is ready but doesn't meet ping/signal conditions
-                break
+            passed = (
+                signal_strength > valid_signal and avg_ping_time < config_ping_value
+            )
+            return passed, avg_ping_time, signal_strength
 
-        # Wait a short while before checking again
-        time.sleep(5)
+        # Poll quickly at first, then back off exponentially up to 5 seconds
+        await asyncio.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, 5)
 
-    # If the conditions aren't met within the wait_time, return False.
-    return False
+    # The station did not register within the wait_time.
+    return False, float("inf"), None
 
 
-def run_bandwidth_test(api, params):
+async def run_bandwidth_test(tool_resource, params):
     """
     Run the bandwidth test using the MikroTik RouterOS API.
 
     Args:
-    - api (routeros_api.RouterOsApi): The API instance for RouterOS communication.
+    - tool_resource (object): The ``/tool`` API resource.
     - params (dict): Dictionary containing bandwidth test parameters.
 
     Returns:
@@ -293,7 +671,9 @@ def run_bandwidth_test(api, params):
         test_args["remote-tx-speed"] = f"{params['remote_tx']}M"
 
     try:
-        test_results = api.get_resource("/tool").call("bandwidth-test", test_args)
+        test_results = await run_blocking(
+            tool_resource.call, "bandwidth-test", test_args
+        )
         print("this is test result:\n ", test_results)
         return test_results
     except Exception as e:
@@ -301,8 +681,69 @@ def run_bandwidth_test(api, params):
         return None
 
 
-def main():
-    ap_details, frequency_range, bandwidth_test_params = gather_info()
+def log_results_to_file(
+    log_fd, freq, average_ping_time, signal, ap_ip, station_ip, result
+):
+    """
+    Append the parameter table and bandwidth test results for one frequency to the log file.
+
+    The whole block is assembled in memory and written with ``os.write``, normally in a single call.
+
+    Args:
+    - log_fd (int): Descriptor of the log file, opened once for the whole sweep in append mode.
+    - freq (int): Tested frequency in MHz.
+    - average_ping_time (float): Average ping time measured on this frequency.
+    - signal (int): Signal strength reported by the registration table.
+    - ap_ip (str): IP Address of the Access Point.
+    - station_ip (str): IP Address of the Station.
+    - result (list): Rows returned by the bandwidth test.
+    """
+    # Test Parameters Table
+    lines = [
+        PARAMETER_TABLE_HEADER,
+        "| {:<23}| {:<25}|\n".format("Frequency", freq),
+        "| {:<23}| {:<25}|\n".format("Average Ping Time", average_ping_time),
+        "| {:<23}| {:<25}|\n".format("Signal", signal),
+        "| {:<23}| {:<25}|\n".format("AP IP", ap_ip),
+        "| {:<23}| {:<25}|\n".format("Station IP", station_ip),
+        "+{:-^25}+{:-^25}+\n\n".format("", ""),
+        # Data Table Headers
+        RESULT_TABLE_HEADER,
+    ]
+
+    # Print data rows
+    for entry in result:
+        # Convert values from bps to Mbps
+        for field in BPS_FIELDS:
+            if field in entry and entry[field] != "-":
+                entry[field] = float(entry[field]) / 1_000_000  # Convert to Mbps
+
+        values = [entry.get(header, "-") for header in RESULT_HEADERS]
+        lines.append(RESULT_ROW_FORMAT.format(*values) + "\n")
+
+    lines.append(RESULT_TABLE_BORDER)
+
+    payload = memoryview("".join(lines).encode())
+    # os.write may write only part of the payload; keep going until all of it is on disk
+    while payload:
+        written = os.write(log_fd, payload)
+        payload = payload[written:]
+
+
+async def main(options=None):
+    """
+    Run the frequency sweep.
+
+    Args:
+    - options (argparse.Namespace, optional): Options from ``parse_args``; missing values are prompted for.
+    """
+    # One worker thread owns the API socket; asyncio.run() shuts it down on exit
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="routeros-api"
+        )
+    )
+    ap_details, frequency_range, bandwidth_test_params = gather_info(options)
     config = read_config_from_json("config.json")
     connection = routeros_api.RouterOsApiPool(
         ap_details["IP"],
@@ -312,103 +753,56 @@ def main():
         plaintext_login=True,
     )
 
-    api = connection.get_api()
-    bps_fields = [
-        "tx-current",
-        "tx-10-second-avg",
-        "tx-total-avg",
-        "rx-current",
-        "rx-10-second-average",
+    api = await run_blocking(connection.get_api)
+    tune_api_socket(connection)
+    wireless_resource = api.get_resource("/interface/wireless")
+    wireless_binary_resource = api.get_binary_resource("/interface/wireless")
+    registration_resource = api.get_resource("interface/wireless/registration-table")
+    root_resource = api.get_resource("/")
+    tool_resource = api.get_resource("/tool")
+    wireless_interfaces = await get_wireless_interfaces(wireless_resource)
+    ap_ip = ap_details.get("IP")
+    station_ip = bandwidth_test_params.get("station_IP")
+    log_fd = os.open("Results.txt", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    frequencies = range(frequency_range[0], frequency_range[1] + 1, 5)
+    freq_bytes = [str(freq).encode("ascii") for freq in frequencies]
+    interface_ids = [
+        (interface["name"], interface["id"].encode())
+        for interface in wireless_interfaces
     ]
-    for freq in range(frequency_range[0], frequency_range[1] + 1, 5):
-        set_frequency(api, freq)
-
-        if not check_station_registered(
-            api,
-            config["wait_for_registration"],
-            config["valid_ping_time"],
-            ap_details.get("IP"),
-            bandwidth_test_params.get("station_IP"),
-        ):
-            continue
-        test_time = datetime.datetime.now()
-        print(f"Running test for frequency: {freq}MHz")
-        result = run_bandwidth_test(api, bandwidth_test_params)
-        average_ping_time = SHARED_DATA["average_ping_time"]
-        signal = SHARED_DATA["signal"]
-        ap_ip = ap_details.get("IP")
-        station_ip = bandwidth_test_params.get("station_IP")
-        # Prepare the headers and data lines
-        headers = [
-            "status",
-            "duration",
-            "tx-current",
-            "tx-10-second-avg",
-            "tx-total-avg",
-            "rx-current",
-            "rx-10-second-average",
-            "rx-total-avg",
-            "random-data",
-            "direction",
-            "conn-count",
-            ".section",
-            "local-cpu-load",
-            "remote-cpu-load",
-        ]
-
-        with open("Results.txt", "a") as file:
-            # Test Parameters Table
-            file.write("+{:-^24}+{:-^26}+\n".format("", ""))
-            file.write("| {:<23}| {:<25}|\n".format("Parameter", "Value"))
-            file.write("+{:-^24}+{:-^26}+\n".format("", ""))
-            file.write("| {:<23}| {:<25}|\n".format("Frequency", freq))
-            file.write(
-                "| {:<23}| {:<25}|\n".format("Average Ping Time", average_ping_time)
-            )
-            file.write("| {:<23}| {:<25}|\n".format("Signal", signal))
-            file.write("| {:<23}| {:<25}|\n".format("AP IP", ap_ip))
-            file.write("| {:<23}| {:<25}|\n".format("Station IP", station_ip))
-            file.write("+{:-^25}+{:-^25}+\n\n".format("", ""))
-
-            # Data Table Headers
-            file.write(
-                "| {:<13}| {:<9}| {:<11}| {:<17}| {:<13}| {:<11}| {:<17}| {:<13}| {:<12}| {:<9}| {:<10}| {:<8}| {:<15}| {:<15}|".format(
-                    *headers
-                )
-            )
-            file.write("\n")
-            file.write(
-                "+{:-^14}+{:-^10}+{:-^12}+{:-^18}+{:-^14}+{:-^12}+{:-^18}+{:-^14}+{:-^13}+{:-^10}+{:-^11}+{:-^9}+{:-^16}+{:-^16}+\n".format(
-                    *[""] * len(headers)
-                )
+    try:
+        for freq, freq_encoded in zip(frequencies, freq_bytes):
+            await set_frequency(
+                wireless_binary_resource, interface_ids, freq, freq_encoded
             )
 
-            # Print data rows
-            for entry in result:
-                # Convert values from bps to Mbps
-                for field in bps_fields:
-                    if field in entry and entry[field] != "-":
-                        entry[field] = (
-                            float(entry[field]) / 1_000_000
-                        )  # Convert to Mbps
-
-                values = [entry.get(header, "-") for header in headers]
-                data_line = "| {:<13}| {:<9}| {:<11}| {:<17}| {:<13}| {:<11}| {:<17}| {:<13}| {:<12}| {:<9}| {:<10}| {:<8}| {:<15}| {:<15}|\n".format(
-                    *values
-                )
-                file.write(data_line)
-
-            file.write(
-                "+{:-^14}+{:-^10}+{:-^12}+{:-^18}+{:-^14}+{:-^12}+{:-^18}+{:-^14}+{:-^13}+{:-^10}+{:-^11}+{:-^9}+{:-^16}+{:-^16}+".format(
-                    *[""] * len(headers)
-                )
+            passed, average_ping_time, signal = await check_station_registered(
+                registration_resource,
+                root_resource,
+                config["wait_for_registration"],
+                config["valid_ping_time"],
+                ap_ip,
+                station_ip,
             )
-
-        # Wait for the test duration plus an additional delay before moving to the next frequency
-        time.sleep(bandwidth_test_params["duration"] + 3)
+            if not passed:
+                continue
+            print(f"Running test for frequency: {freq}MHz")
+            result = await run_bandwidth_test(tool_resource, bandwidth_test_params)
+            log_results_to_file(
+                log_fd,
+                freq,
+                average_ping_time,
+                signal,
+                ap_ip,
+                station_ip,
+                result,
+            )
+    finally:
+        os.fsync(log_fd)
+        os.close(log_fd)
 
     connection.disconnect()
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main(parse_args()))